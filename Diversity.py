@@ -0,0 +1,214 @@
+#跨模型、跨提示词类型的 SimCSE 相似度分析，分块计算 top-k，统计每个领域和模型对的重复率
+import os
+import json
+import glob
+import hashlib
+import argparse
+import itertools
+import numpy as np
+import pandas as pd
+
+
+def discover(result_dir):
+    """查找 result_dir/{提示词类型}/{模型}_answers.json"""
+    cells = []
+    for path in sorted(glob.glob(os.path.join(result_dir, "*", "*_answers.json"))):
+        prompt_type = os.path.basename(os.path.dirname(path))
+        model = os.path.basename(path)[:-len("_answers.json")]
+        cells.append((prompt_type, model, path))
+    return cells
+
+
+def load_sentences(path):
+    """读取答案文件中的所有答案"""
+    with open(path, "r", encoding="utf-8") as f:
+        data = json.load(f)
+    return [item.get("answer", item.get("response", "")) for item in data]
+
+
+class SimCSEEncoder:
+    def __init__(self, model_path, batch_size=64, max_length=512):
+        import torch
+        from transformers import AutoModel, AutoTokenizer
+
+        self.torch = torch
+        self.tokenizer = AutoTokenizer.from_pretrained(model_path)
+        self.model = AutoModel.from_pretrained(model_path).eval()
+        self.batch_size = batch_size
+        self.max_length = max_length
+
+    def encode(self, sentences):
+        """分批计算 L2 归一化后的句向量"""
+        embeddings = []
+        for start in range(0, len(sentences), self.batch_size):
+            batch = sentences[start:start + self.batch_size]
+            inputs = self.tokenizer(batch, padding=True, truncation=True, max_length=self.max_length,
+                                    return_tensors="pt")
+            with self.torch.no_grad():
+                output = self.model(**inputs, output_hidden_states=True, return_dict=True).pooler_output
+            embeddings.append(output.numpy().astype(np.float32))
+        embeddings = np.concatenate(embeddings) if embeddings else np.zeros((0, 768), dtype=np.float32)
+        return embeddings / np.maximum(np.linalg.norm(embeddings, axis=1, keepdims=True), 1e-12)
+
+
+def _hash_file(digest, path):
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            digest.update(chunk)
+
+
+def load_embeddings(path, encoder_factory, cache_dir=".embedding_cache", model_path="", max_length=512):
+    """读取答案文件的句向量（内存映射），答案文件、模型和 max_length 都未变化时直接使用缓存"""
+    digest = hashlib.sha256()
+    _hash_file(digest, path)
+    # 缓存键包含模型路径及其配置，切换 SimCSE 模型后不会误用旧的句向量
+    digest.update(f"|{os.path.abspath(model_path)}|{max_length}|".encode("utf-8"))
+    model_config = os.path.join(model_path, "config.json")
+    if os.path.isfile(model_config):
+        _hash_file(digest, model_config)
+    cache_path = os.path.join(cache_dir, f"{digest.hexdigest()}.npy")
+    if not os.path.exists(cache_path):
+        embeddings = encoder_factory().encode(load_sentences(path))
+        os.makedirs(cache_dir, exist_ok=True)
+        np.save(cache_path, embeddings)
+    return np.load(cache_path, mmap_mode="r")
+
+
+def blockwise_topk(queries, keys, k=5, block_size=1024, exclude_self=False):
+    """
+    分块矩阵乘法计算每个 query 与 keys 的 top-k 余弦相似度
+
+    内存占用只与 block_size 和 k 有关，与 queries/keys 的总数无关
+
+    Returns:
+        scores: (len(queries), k) 相似度，从高到低
+        indices: (len(queries), k) 对应 keys 的下标
+    """
+    k = min(k, len(keys) - (1 if exclude_self else 0))
+    num_queries = len(queries)
+    scores = np.full((num_queries, k), -np.inf, dtype=np.float32)
+    indices = np.full((num_queries, k), -1, dtype=np.int64)
+    if k <= 0:
+        return scores, indices
+
+    for q_start in range(0, num_queries, block_size):
+        q_block = np.asarray(queries[q_start:q_start + block_size], dtype=np.float32)
+        best_scores = np.full((len(q_block), k), -np.inf, dtype=np.float32)
+        best_indices = np.full((len(q_block), k), -1, dtype=np.int64)
+
+        for k_start in range(0, len(keys), block_size):
+            k_block = np.asarray(keys[k_start:k_start + block_size], dtype=np.float32)
+            sims = q_block @ k_block.T
+            if exclude_self:
+                rows = np.arange(len(q_block))
+                cols = rows + q_start - k_start
+                valid = (cols >= 0) & (cols < len(k_block))
+                sims[rows[valid], cols[valid]] = -np.inf
+
+            # 合并当前块与已有的 top-k
+            merged_scores = np.concatenate([best_scores, sims], axis=1)
+            merged_indices = np.concatenate(
+                [best_indices, np.broadcast_to(np.arange(k_start, k_start + len(k_block)), sims.shape)], axis=1)
+            top = np.argpartition(-merged_scores, k - 1, axis=1)[:, :k]
+            best_scores = np.take_along_axis(merged_scores, top, axis=1)
+            best_indices = np.take_along_axis(merged_indices, top, axis=1)
+
+        order = np.argsort(-best_scores, axis=1)
+        scores[q_start:q_start + len(q_block)] = np.take_along_axis(best_scores, order, axis=1)
+        indices[q_start:q_start + len(q_block)] = np.take_along_axis(best_indices, order, axis=1)
+    return scores, indices
+
+
+def redundancy_table(embeddings, fields, answers_per_field=100, k=5, threshold=0.8, block_size=1024, scope="field"):
+    """
+    计算每个模型对（按领域）的重复率
+
+    Args:
+        embeddings (dict): {(提示词类型, 模型): 句向量}
+        fields (list): 领域名称列表
+        answers_per_field (int): 每个领域的答案数
+        k (int): 保留的最近邻数
+        threshold (float): 判定为重复想法的相似度阈值
+        block_size (int): 分块大小
+        scope (str): 'field' 只在同一领域内比较，'all' 与对方全部答案比较
+
+    Returns:
+        DataFrame: 每个 (A, B, 领域) 的平均最大相似度、平均 top-k 相似度与重复率
+    """
+    rows = []
+    for (cell_a, emb_a), (cell_b, emb_b) in itertools.permutations(embeddings.items(), 2):
+        if scope == "all":
+            top_scores, _ = blockwise_topk(emb_a, emb_b, k, block_size)
+        for field_index, field in enumerate(fields):
+            start, end = field_index * answers_per_field, (field_index + 1) * answers_per_field
+            if start >= len(emb_a):
+                break
+            if scope == "all":
+                scores = top_scores[start:end]
+            else:
+                scores, _ = blockwise_topk(emb_a[start:end], emb_b[start:end], k, block_size)
+            if scores.shape[1] == 0:
+                continue
+            rows.append({
+                "prompt_a": cell_a[0], "model_a": cell_a[1],
+                "prompt_b": cell_b[0], "model_b": cell_b[1],
+                "field": field,
+                "count": len(scores),
+                "mean_top1": float(scores[:, 0].mean()),
+                "mean_topk": float(scores.mean()),
+                "redundancy_rate": float((scores[:, 0] >= threshold).mean()),
+            })
+    return pd.DataFrame(rows)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Cross-model answer redundancy with blockwise SimCSE similarity")
+    parser.add_argument("--result_dir", type=str, default="HIC/result", help="Folder with one subfolder per prompt type")
+    parser.add_argument("--dataset_path", type=str, default="HIC/CDID.csv", help="Dataset Path")
+    parser.add_argument("--model_path", type=str, default="./models/sup-simcse-bert-base-uncased", help="SimCSE Model Path")
+    parser.add_argument("--output_dir", type=str, default="report", help="Output Directory")
+    parser.add_argument("--cache_dir", type=str, default=".embedding_cache", help="Embedding Cache Directory")
+    parser.add_argument("--max_length", type=int, default=512, help="SimCSE Max Tokens Per Answer")
+    parser.add_argument("--answers_per_field", type=int, default=100, help="Answers Per Field")
+    parser.add_argument("--top_k", type=int, default=5, help="Nearest Neighbours Kept Per Answer")
+    parser.add_argument("--threshold", type=float, default=0.8, help="Similarity Counted As A Repeated Idea")
+    parser.add_argument("--block_size", type=int, default=1024, help="Rows Per Similarity Block")
+    parser.add_argument("--scope", type=str, default="field", choices=["field", "all"], help="Comparison Scope")
+    args = parser.parse_args()
+
+    # SimCSE 模型只在需要计算新句向量时加载
+    encoder = []
+
+    def encoder_factory():
+        if not encoder:
+            encoder.append(SimCSEEncoder(args.model_path, max_length=args.max_length))
+        return encoder[0]
+
+    fields = list(dict.fromkeys(pd.read_csv(args.dataset_path)["Field"]))
+    embeddings = {
+        (prompt_type, model): load_embeddings(path, encoder_factory, args.cache_dir, args.model_path, args.max_length)
+        for prompt_type, model, path in discover(args.result_dir)
+    }
+    table = redundancy_table(embeddings, fields, args.answers_per_field, args.top_k,
+                             args.threshold, args.block_size, args.scope)
+    if table.empty:
+        print("No answer files found")
+        return
+
+    summary = table.groupby(["prompt_a", "model_a", "prompt_b", "model_b"], sort=False).apply(
+        lambda group: pd.Series({
+            "count": group["count"].sum(),
+            "mean_top1": np.average(group["mean_top1"], weights=group["count"]),
+            "redundancy_rate": np.average(group["redundancy_rate"], weights=group["count"]),
+        })
+    )
+
+    os.makedirs(args.output_dir, exist_ok=True)
+    table.to_csv(os.path.join(args.output_dir, "redundancy_by_field.csv"), index=False)
+    summary.to_csv(os.path.join(args.output_dir, "redundancy_by_pair.csv"))
+    with pd.option_context("display.max_rows", None, "display.width", 200):
+        print(summary.round(4))
+
+
+if __name__ == "__main__":
+    main()
@@ -1,12 +1,16 @@
 import pandas as pd
-from openai import OpenAI
 import time
 import json
 import yaml
 import os
+import sys
+from concurrent.futures import ThreadPoolExecutor
 from typing import Dict, List, Any
 from datetime import datetime
 
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from http_client import configure_pool, get_client
+
 class DynamicPromptModel:
     def __init__(self, config_path: str = "config_dynamic.yaml"):
         # 获取当前文件的目录
@@ -15,10 +19,13 @@ class DynamicPromptModel:
         # 加载配置
         self.config = self._load_config(config_path)
         
-        # 初始化 OpenAI 客戶端
-        self.client = OpenAI(
-            api_key=self.config["api_settings"]["api_key"],
-            base_url=self.config["api_settings"]["base_url"]
+        # 初始化 OpenAI 客戶端（并行模式下按并发领域数设置连接池）
+        parallel_settings = self.config.get("parallel_settings", {})
+        if parallel_settings.get("enabled"):
+            configure_pool(concurrency=parallel_settings.get("max_workers") or len(self.config["fields"]))
+        self.client = get_client(
+            self.config["api_settings"]["api_key"],
+            self.config["api_settings"]["base_url"]
         )
         
         # 初始化动态提示词示例
@@ -56,8 +63,10 @@ class DynamicPromptModel:
             df.iloc[:, self.config["data_settings"]["principle_column"]].dropna().tolist()
         )
 
-    def _update_prompt(self) -> str:
+    def _update_prompt(self, examples: Dict[str, str] = None) -> str:
         """更新动态提示词"""
+        if examples is None:
+            examples = self.dynamic_prompt_examples
         return (f"Assume you are an expert in the given field. "
                 f"Please provide an answers to the following question,not exceeding 70 tokens. "
                 f"Requirements:\n"
@@ -66,8 +75,8 @@ class DynamicPromptModel:
                 f"3. Ensure the answer has value for the target field.\n"
                 f"4. Maintain logical rigor without contradictions or vague statements.\n"
                 f"Format: Plain text, no numbering or Markdown. Each answer is separated by a blank line.\n"
-                f"{self.dynamic_prompt_examples['positive']}"
-                f"{self.dynamic_prompt_examples['negative']}")
+                f"{examples['positive']}"
+                f"{examples['negative']}")
 
     def _evaluate_answer(self, question: str, answer: str) -> str:
         """评估回答"""
@@ -125,8 +134,11 @@ class DynamicPromptModel:
         )
         return response.choices[0].message.content.strip()
 
-    def _save_answers_to_json(self, answers: List[str], question_info: Dict[str, Any]) -> None:
+    def _save_answers_to_json(self, answers: List[str], question_info: Dict[str, Any],
+                              answers_path: str = None) -> None:
         """将回答保存为 JSON 格式"""
+        if answers_path is None:
+            answers_path = self.config["output_settings"]["answers_path"]
         answer_data = {
             "question_id": question_info["global_index"] + 1,
             "field": question_info["field"],
@@ -137,7 +149,7 @@ class DynamicPromptModel:
 
         # 读取现有数据或创建新的数据列表
         try:
-            with open(self.config["output_settings"]["answers_path"], 'r', encoding='utf-8') as f:
+            with open(answers_path, 'r', encoding='utf-8') as f:
                 all_data = json.load(f)
         except (FileNotFoundError, json.JSONDecodeError):
             all_data = []
@@ -145,93 +157,199 @@ class DynamicPromptModel:
         all_data.append(answer_data)
 
         # 保存更新后的数据
-        with open(self.config["output_settings"]["answers_path"], 'w', encoding='utf-8') as f:
+        with open(answers_path, 'w', encoding='utf-8') as f:
             json.dump(all_data, f, ensure_ascii=False, indent=2)
 
-    def process_questions(self, start_question: int = 1) -> None:
-        """处理所有问题并生成回答"""
+    def _process_field(self, field_index: int, field_questions: List[str], start_index: int,
+                       examples: Dict[str, str], answers_path: str = None, evaluation_path: str = None) -> None:
+        """处理单个领域的问题，并用评估结果更新该领域的动态提示词示例"""
+        if evaluation_path is None:
+            evaluation_path = self.config["output_settings"]["evaluation_path"]
+        field = self.config["fields"][field_index]
+
+        for i, question in enumerate(field_questions, start=start_index):
+            global_question_index = field_index * 10 + i
+
+            print(f"处理问题 {global_question_index + 1} 在 {field} 领域...")
+
+            # 生成回答
+            prompt = self._update_prompt(examples)
+            response = self.client.chat.completions.create(
+                model=self.config["answer_model_settings"]["model_name"],
+                messages=[{"role": "user", "content": prompt + f"\nField: {field}\nQuestion: {question}"}],
+                temperature=self.config["answer_model_settings"]["temperature"],
+                max_tokens=self.config["answer_model_settings"]["max_tokens"]
+            )
+
+            answers = response.choices[0].message.content.strip().split("\n\n")
+
+            # 保存回答
+            self._save_answers_to_json(
+                answers,
+                {
+                    "global_index": global_question_index,
+                    "field": field,
+                    "question": question
+                },
+                answers_path
+            )
+
+            # 评估回答并更新动态提示词
+            best_positive = {"score": 0, "text": ""}
+            best_negative = ""
+
+            with open(evaluation_path, "a", encoding="utf-8") as f:
+                for a_index, answer in enumerate(answers):
+                    eval_result = self._evaluate_answer(question, answer)
+                    print(eval_result)
+                    f.write(f"{global_question_index * 10 + a_index + 1}: {eval_result}\n")
+
+                    # 解析评估结果
+                    parts = eval_result.split()
+                    scores = {
+                        parts[0].strip(":"): int(parts[1]),
+                        parts[2].strip(":"): int(parts[3]),
+                        parts[4].strip(":"): int(parts[5])
+                    }
+                    hallucination = parts[7].strip().lower() == "yes"
+
+                    # 更新动态提示词示例
+                    total_score = sum(scores.values())
+                    if scores["Originality"] >= 4 and scores["Feasibility"] >= 3 and scores["Value"] >= 4:
+                        if total_score > best_positive["score"]:
+                            best_positive = {"score": total_score, "text": f"Positive Example:\n{answer}\n"}
+
+                    if hallucination:
+                        best_negative = f"Negative Example (Hallucination):\n{answer}\n"
+
+                if best_positive["text"]:
+                    examples["positive"] = best_positive["text"]
+                if best_negative:
+                    examples["negative"] = best_negative
+
+            time.sleep(1)
+
+    def _field_plan(self, start_question: int) -> List[tuple]:
+        """按领域划分待处理的问题，返回 (领域编号, 问题列表, 起始编号)"""
         questions, principles = self._load_questions()
 
         start_global_index = start_question - 1
         start_field_index = start_global_index // 10
         start_question_index = start_global_index % 10
 
+        plan = []
         for field_index in range(start_field_index, len(self.config["fields"])):
-            field = self.config["fields"][field_index]
-            start_index = field_index * 10
-            end_index = start_index + 10
-            field_questions = questions[start_index:end_index]
-            field_principles = principles[start_index:end_index]
-
-            if field_index == start_field_index:
-                field_questions = field_questions[start_question_index:]
-                field_principles = field_principles[start_question_index:]
-
-            for i, (question, principle) in enumerate(zip(field_questions, field_principles),
-                                                    start=start_question_index if field_index == start_field_index else 0):
-                global_question_index = field_index * 10 + i
-
-                print(f"处理问题 {global_question_index + 1}/{len(questions)} 在 {field} 领域...")
-
-                # 生成回答
-                prompt = self._update_prompt()
-                response = self.client.chat.completions.create(
-                    model=self.config["answer_model_settings"]["model_name"],
-                    messages=[{"role": "user", "content": prompt + f"\nField: {field}\nQuestion: {question}"}],
-                    temperature=self.config["answer_model_settings"]["temperature"],
-                    max_tokens=self.config["answer_model_settings"]["max_tokens"]
-                )
+            field_questions = questions[field_index * 10:field_index * 10 + 10]
+            start_index = start_question_index if field_index == start_field_index else 0
+            plan.append((field_index, field_questions[start_index:], start_index))
+        return plan
 
-                answers = response.choices[0].message.content.strip().split("\n\n")
-                
-                # 保存回答
-                self._save_answers_to_json(
-                    answers,
-                    {
-                        "global_index": global_question_index,
-                        "field": field,
-                        "question": question
-                    }
+    def process_questions(self, start_question: int = 1) -> None:
+        """处理所有问题并生成回答"""
+        for field_index, field_questions, start_index in self._field_plan(start_question):
+            self._process_field(field_index, field_questions, start_index, self.dynamic_prompt_examples)
+
+        print("处理完成。")
+
+    def process_fields_parallel(self, start_question: int = 1, max_workers: int = None) -> None:
+        """
+        每个领域独立维护动态提示词示例并发处理，完成后按领域顺序合并输出
+
+        每个领域完成后写入 .done 标记，合并后标记为 merged；某些领域失败时，
+        只合并失败领域之前已完成的领域，其余已完成领域的输出保留到下次运行时合并，不会重新生成
+        """
+        answers_path = self.config["output_settings"]["answers_path"]
+        evaluation_path = self.config["output_settings"]["evaluation_path"]
+        answers_root, answers_ext = os.path.splitext(answers_path)
+        evaluation_root, evaluation_ext = os.path.splitext(evaluation_path)
+
+        plan = self._field_plan(start_question)
+        field_outputs = {}
+        markers = {}
+        states = {}
+        for field_index, _, _ in plan:
+            field_outputs[field_index] = (
+                f"{answers_root}_field{field_index + 1}{answers_ext}",
+                f"{evaluation_root}_field{field_index + 1}{evaluation_ext}"
+            )
+            markers[field_index] = f"{answers_root}_field{field_index + 1}.done"
+            if os.path.exists(markers[field_index]):
+                with open(markers[field_index], 'r', encoding='utf-8') as f:
+                    states[field_index] = f.read().strip()
+                continue
+            # 清除上次运行中未完成领域留下的输出
+            for path in field_outputs[field_index]:
+                if os.path.exists(path):
+                    os.remove(path)
+
+        def mark(field_index, state):
+            states[field_index] = state
+            with open(markers[field_index], 'w', encoding='utf-8') as f:
+                f.write(state)
+
+        failed = {}
+        with ThreadPoolExecutor(max_workers=max_workers or len(plan) or 1) as executor:
+            futures = {
+                field_index: executor.submit(
+                    self._process_field, field_index, field_questions, start_index,
+                    {"positive": "", "negative": ""}, *field_outputs[field_index]
                 )
+                for field_index, field_questions, start_index in plan
+                if field_index not in states
+            }
+            for field_index, future in futures.items():
+                try:
+                    future.result()
+                except Exception as e:
+                    print(f"领域 {field_index + 1} 处理失败: {e}")
+                    failed[field_index] = e
+                    continue
+                mark(field_index, "done")
+
+        # 按领域顺序合并输出，遇到失败的领域即停止，保证合并结果的顺序
+        to_merge = []
+        for field_index, _, _ in plan:
+            if field_index in failed:
+                break
+            if states[field_index] == "done":
+                to_merge.append(field_index)
+
+        try:
+            with open(answers_path, 'r', encoding='utf-8') as f:
+                all_data = json.load(f)
+        except (FileNotFoundError, json.JSONDecodeError):
+            all_data = []
+
+        with open(evaluation_path, "a", encoding="utf-8") as out:
+            for field_index in to_merge:
+                field_answers_path, field_evaluation_path = field_outputs[field_index]
+                if os.path.exists(field_answers_path):
+                    with open(field_answers_path, 'r', encoding='utf-8') as f:
+                        all_data.extend(json.load(f))
+                if os.path.exists(field_evaluation_path):
+                    with open(field_evaluation_path, 'r', encoding='utf-8') as f:
+                        out.write(f.read())
+
+        with open(answers_path, 'w', encoding='utf-8') as f:
+            json.dump(all_data, f, ensure_ascii=False, indent=2)
+        for field_index in to_merge:
+            mark(field_index, "merged")
 
-                # 评估回答并更新动态提示词
-                best_positive = {"score": 0, "text": ""}
-                best_negative = ""
-
-                with open(self.config["output_settings"]["evaluation_path"], "a", encoding="utf-8") as f:
-                    for a_index, answer in enumerate(answers):
-                        eval_result = self._evaluate_answer(question, answer)
-                        print(eval_result)
-                        f.write(f"{global_question_index * 10 + a_index + 1}: {eval_result}\n")
-
-                        # 解析评估结果
-                        parts = eval_result.split()
-                        scores = {
-                            parts[0].strip(":"): int(parts[1]),
-                            parts[2].strip(":"): int(parts[3]),
-                            parts[4].strip(":"): int(parts[5])
-                        }
-                        hallucination = parts[7].strip().lower() == "yes"
-
-                        # 更新动态提示词示例
-                        total_score = sum(scores.values())
-                        if scores["Originality"] >= 4 and scores["Feasibility"] >= 3 and scores["Value"] >= 4:
-                            if total_score > best_positive["score"]:
-                                best_positive = {"score": total_score, "text": f"Positive Example:\n{answer}\n"}
-
-                        if hallucination:
-                            best_negative = f"Negative Example (Hallucination):\n{answer}\n"
-
-                    if best_positive["text"]:
-                        self.dynamic_prompt_examples["positive"] = best_positive["text"]
-                    if best_negative:
-                        self.dynamic_prompt_examples["negative"] = best_negative
-
-                time.sleep(1)
+        if failed:
+            fields = sorted(field_index + 1 for field_index in failed)
+            raise RuntimeError(f"领域 {fields} 处理失败，已完成的领域输出已保留，重新运行以继续")
 
+        # 全部领域合并完成后清除标记
+        for path in markers.values():
+            if os.path.exists(path):
+                os.remove(path)
         print("处理完成。")
 
 if __name__ == "__main__":
     # 创建模型实例并运行
     model = DynamicPromptModel()
-    model.process_questions(start_question=1) 
\ No newline at end of file
+    parallel_settings = model.config.get("parallel_settings", {})
+    if parallel_settings.get("enabled"):
+        model.process_fields_parallel(start_question=1, max_workers=parallel_settings.get("max_workers"))
+    else:
+        model.process_questions(start_question=1) 
\ No newline at end of file
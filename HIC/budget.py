@@ -0,0 +1,169 @@
+"""
+预算控制模組
+"""
+
+import threading
+import time
+
+
+class BudgetGovernor:
+    def __init__(self, max_cost=0, max_tokens=0, max_seconds=0, soft_ratio=0.8,
+                 throttle_seconds=0, prices=None):
+        """
+        初始化预算控制器
+
+        Args:
+            max_cost (float): 最大花费（美元），0 表示不限制
+            max_tokens (int): 最大 token 总数，0 表示不限制
+            max_seconds (float): 最长运行时间（秒），0 表示不限制
+            soft_ratio (float): 软限制比例，超过后进入节流/降级状态
+            throttle_seconds (float): 节流时每个问题之前的等待时间（秒）
+            prices (dict): 每千 token 单价，格式为 {role: (prompt_price, completion_price)}
+        """
+        self.max_cost = max_cost or 0
+        self.max_tokens = max_tokens or 0
+        self.max_seconds = max_seconds or 0
+        self.soft_ratio = soft_ratio
+        self.throttle_seconds = throttle_seconds or 0
+        self.prices = prices or {}
+
+        self.start_time = time.time()
+        self.prompt_tokens = 0
+        self.completion_tokens = 0
+        self.cost = 0.0
+        self.completed = 0
+        self._lock = threading.Lock()
+
+    @property
+    def total_tokens(self):
+        return self.prompt_tokens + self.completion_tokens
+
+    @property
+    def elapsed(self):
+        return time.time() - self.start_time
+
+    def record(self, role, usage):
+        """
+        记录一次 API 调用的实际用量
+
+        Args:
+            role (str): 调用方（'model'、'eval' 或 'fallback_eval'）
+            usage: 响应中的 usage 对象
+        """
+        if usage is None:
+            return
+        prompt_tokens = getattr(usage, 'prompt_tokens', 0) or 0
+        completion_tokens = getattr(usage, 'completion_tokens', 0) or 0
+        prompt_price, completion_price = self.prices.get(role, (0, 0))
+
+        with self._lock:
+            self.prompt_tokens += prompt_tokens
+            self.completion_tokens += completion_tokens
+            self.cost += (prompt_tokens * prompt_price + completion_tokens * completion_price) / 1000
+
+    def mark_done(self):
+        """标记一个问题处理完成"""
+        with self._lock:
+            self.completed += 1
+
+    def project(self, remaining):
+        """
+        根据已完成问题的平均用量预测总花费和总时间
+
+        Args:
+            remaining (int): 剩余问题数
+
+        Returns:
+            dict: 预测的 token 数、花费和时间
+        """
+        with self._lock:
+            if self.completed == 0:
+                return {"tokens": self.total_tokens, "cost": self.cost, "seconds": self.elapsed}
+            scale = (self.completed + remaining) / self.completed
+            return {
+                "tokens": self.total_tokens * scale,
+                "cost": self.cost * scale,
+                "seconds": self.elapsed * scale
+            }
+
+    def _limits(self):
+        """返回 (名称, 已用量, 限制, 每个问题平均用量) 列表，只包含已设置的限制"""
+        with self._lock:
+            usage = (
+                ("tokens", self.total_tokens, self.max_tokens),
+                ("cost", self.cost, self.max_cost),
+                ("seconds", self.elapsed, self.max_seconds)
+            )
+            completed = self.completed
+        return [(name, used, limit, used / completed if completed else 0)
+                for name, used, limit in usage if limit > 0]
+
+    def _pressure(self, names=("tokens", "cost", "seconds")):
+        """是否有限制已用到软限制比例"""
+        return any(used >= self.soft_ratio * limit
+                   for name, used, limit, _ in self._limits() if name in names)
+
+    def check(self, in_flight=0):
+        """
+        检查预算状态
+
+        Args:
+            in_flight (int): 已提交但尚未完成的问题数（并发评估时使用）
+
+        Returns:
+            str: 'ok'、'degrade'（已用到软限制比例）或 'stop'（再处理一个问题就会超出限制）
+        """
+        # 按已完成问题的平均用量估计下一个问题，避免超出限制
+        if any(used + per_question * (in_flight + 1) > limit or used >= limit
+               for _, used, limit, per_question in self._limits()):
+            return 'stop'
+        if self._pressure():
+            return 'degrade'
+        return 'ok'
+
+    def throttle(self):
+        """节流等待，仅在 token 或花费接近限制时生效（等待会消耗时间限制）"""
+        if self.throttle_seconds > 0 and self._pressure(names=("tokens", "cost")):
+            time.sleep(self.throttle_seconds)
+
+    def summary(self, remaining=0):
+        """
+        生成预算摘要
+
+        Args:
+            remaining (int): 剩余问题数
+
+        Returns:
+            str: 摘要文本
+        """
+        projection = self.project(remaining)
+        return (f"Budget: {self.total_tokens} tokens "
+                f"(prompt {self.prompt_tokens}, completion {self.completion_tokens}), "
+                f"cost ${self.cost:.4f}, elapsed {self.elapsed:.0f}s | "
+                f"projected {projection['tokens']:.0f} tokens, "
+                f"${projection['cost']:.4f}, {projection['seconds']:.0f}s")
+
+
+def from_config(config):
+    """
+    根据配置创建预算控制器
+
+    Args:
+        config (dict): 配置字典
+
+    Returns:
+        BudgetGovernor: 预算控制器
+    """
+    return BudgetGovernor(
+        max_cost=config.get('budget_max_cost', 0),
+        max_tokens=config.get('budget_max_tokens', 0),
+        max_seconds=config.get('budget_max_seconds', 0),
+        soft_ratio=config.get('budget_soft_ratio', 0.8),
+        throttle_seconds=config.get('budget_throttle_seconds', 0),
+        prices={
+            'model': (config.get('model_prompt_price', 0), config.get('model_completion_price', 0)),
+            'eval': (config.get('eval_prompt_price', 0), config.get('eval_completion_price', 0)),
+            'fallback_eval': (config.get('budget_fallback_eval_prompt_price', 0),
+                              config.get('budget_fallback_eval_completion_price', 0))
+        }
+    )
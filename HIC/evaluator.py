@@ -2,11 +2,11 @@
 评估器模組
 """
 
-from openai import OpenAI
+from http_client import get_client
 from prompts import EVALUATION_SYSTEM_PROMPT
 
 class Evaluator:
-    def __init__(self, api_key, base_url, model_name, temperature=0, max_tokens=200):
+    def __init__(self, api_key, base_url, model_name, temperature=0, max_tokens=200, budget=None):
         """
         初始化评估器
         
@@ -16,11 +16,15 @@ class Evaluator:
             model_name (str): 模型名称
             temperature (float): 温度参数
             max_tokens (int): 最大token数
+            budget (BudgetGovernor): 预算控制器（可选）
         """
-        self.client = OpenAI(api_key=api_key, base_url=base_url)
+        self.client = get_client(api_key, base_url)
         self.model_name = model_name
         self.temperature = temperature
         self.max_tokens = max_tokens
+        self.budget = budget
+        # 切换到降级评估模型后改为 'fallback_eval'，按降级模型的单价计费
+        self.budget_role = 'eval'
         
     def evaluate_answer(self, question, answer, answer_index):
         """
@@ -48,6 +52,8 @@ class Evaluator:
             max_tokens=self.max_tokens,
             stream=False
         )
+        if self.budget is not None:
+            self.budget.record(self.budget_role, response.usage)
         
         evaluation_result = response.choices[0].message.content.strip()
         print(evaluation_result)
@@ -0,0 +1,97 @@
+"""
+共享 HTTP 客户端模組
+"""
+
+import importlib.util
+import threading
+
+import httpx
+from openai import OpenAI
+
+_pool_settings = {
+    "max_connections": 16,
+    "keepalive_expiry": 60.0,
+    "connect_timeout": 10.0,
+    "read_timeout": 120.0
+}
+_http_clients = {}
+_openai_clients = {}
+_lock = threading.Lock()
+
+
+def configure_pool(concurrency=None, keepalive_expiry=None, connect_timeout=None, read_timeout=None):
+    """
+    设置连接池参数，需在创建客户端之前调用
+
+    Args:
+        concurrency (int): 并发请求数，用于确定最大连接数
+        keepalive_expiry (float): 空闲连接保持时间（秒）
+        connect_timeout (float): 连接超时（秒）
+        read_timeout (float): 读取超时（秒）
+    """
+    with _lock:
+        if concurrency:
+            # 同时保留评估和生成请求所需的连接
+            _pool_settings["max_connections"] = max(int(concurrency) * 2, 4)
+        if keepalive_expiry is not None:
+            _pool_settings["keepalive_expiry"] = keepalive_expiry
+        if connect_timeout is not None:
+            _pool_settings["connect_timeout"] = connect_timeout
+        if read_timeout is not None:
+            _pool_settings["read_timeout"] = read_timeout
+
+
+def _get_http_client(base_url):
+    """获取（或创建）指定 base_url 的共享 httpx 客户端，调用方需持有 _lock"""
+    if base_url not in _http_clients:
+        _http_clients[base_url] = httpx.Client(
+            limits=httpx.Limits(
+                max_connections=_pool_settings["max_connections"],
+                max_keepalive_connections=_pool_settings["max_connections"],
+                keepalive_expiry=_pool_settings["keepalive_expiry"]
+            ),
+            timeout=httpx.Timeout(
+                _pool_settings["read_timeout"],
+                connect=_pool_settings["connect_timeout"]
+            ),
+            # 安装了 h2 时启用 HTTP/2
+            http2=importlib.util.find_spec("h2") is not None
+        )
+    return _http_clients[base_url]
+
+
+def get_client(api_key, base_url):
+    """
+    获取共享的 OpenAI 客户端，相同 base_url 的客户端共用一个连接池
+
+    Args:
+        api_key (str): API密钥
+        base_url (str): API基础URL
+
+    Returns:
+        OpenAI: OpenAI 客户端
+    """
+    with _lock:
+        key = (base_url, api_key)
+        if key not in _openai_clients:
+            _openai_clients[key] = OpenAI(
+                api_key=api_key,
+                base_url=base_url,
+                http_client=_get_http_client(base_url)
+            )
+        return _openai_clients[key]
+
+
+def from_config(config):
+    """
+    根据配置设置连接池参数
+
+    Args:
+        config (dict): 配置字典
+    """
+    configure_pool(
+        concurrency=config.get('eval_concurrency'),
+        keepalive_expiry=config.get('http_keepalive_expiry'),
+        connect_timeout=config.get('http_connect_timeout'),
+        read_timeout=config.get('http_read_timeout')
+    )
@@ -8,6 +8,10 @@ import yaml
 import pandas as pd
 from model_api import ModelAPI
 from evaluator import Evaluator
+from budget import from_config as budget_from_config
+from shard import ShardManager
+from replay import replay_evaluations
+import http_client
 
 def load_config(config_path):
     """
@@ -22,6 +26,120 @@ def load_config(config_path):
     with open(config_path, 'r', encoding='utf-8') as f:
         return yaml.safe_load(f)
 
+def process_questions(df, question_numbers, config, model_api, evaluator, budget,
+                      responses_file, evaluations_file, fallback_evaluations_file=None,
+                      remaining_after=0, on_question_done=None, resume_hint=None):
+    """
+    依次处理指定编号的问题
+    
+    Args:
+        df (DataFrame): 数据集
+        question_numbers (iterable): 问题编号（从1开始）
+        config (dict): 配置字典
+        model_api (ModelAPI): 模型API
+        evaluator (Evaluator): 评估器
+        budget (BudgetGovernor): 预算控制器
+        responses_file (str): 回应输出文件路径
+        evaluations_file (str): 评估输出文件路径
+        fallback_evaluations_file (str): 切换到降级评估模型后的评估输出文件路径
+        remaining_after (int): 本批之后仍由当前进程处理的问题数，用于预算预测
+        on_question_done (callable): 每个问题完成后的回调，返回 False 时中止
+        resume_hint (str): 预算用尽时的续跑提示，默认提示 --start_question
+        
+    Returns:
+        str: 'done'（处理完所有问题）、'budget'（预算用尽）或 'aborted'（回调中止）
+    """
+    question_numbers = list(question_numbers)
+    for position, question_number in enumerate(question_numbers):
+        row = df.iloc[question_number - 1]
+        
+        # 检查预算
+        remaining = len(question_numbers) - position + remaining_after
+        status = budget.check()
+        if status == 'stop':
+            print(f"\nBudget limit reached. {budget.summary(remaining)}")
+            print(resume_hint or f"Resume with --start_question {question_number}")
+            return 'budget'
+        fallback_model = config.get('budget_fallback_eval_model')
+        if status == 'degrade':
+            if fallback_model and evaluator.model_name != fallback_model:
+                print(f"\nBudget nearly exhausted, switching evaluator to {fallback_model}, "
+                      f"writing evaluations to {fallback_evaluations_file}")
+                evaluator.model_name = fallback_model
+                evaluator.budget_role = 'fallback_eval'
+            budget.throttle()
+            
+        print(f"\nProcessing Question {question_number}:")
+        print(f"Field: {row['Field']}")
+        print(f"Question: {row['Question']}")
+        print(f"Principle: {row['Principle']}")
+        
+        # 生成答案并保存到JSON
+        response = model_api.process_question(
+            question=row['Question'],
+            prompt_type=config['prompt_type'],
+            field=row['Field'],
+            principle=row['Principle'],
+            knowledge=row['Knowledge Base'],
+            output_file=responses_file
+        )
+        
+        print(f"\nModel Response:\n{response}")
+        
+        # 评估答案并保存到TXT
+        evaluator.process_evaluation(
+            question=row['Question'],
+            answer=response,
+            answer_index=question_number,
+            # 降级评估模型的结果写入单独的文件（评估器在之前的分片中切换时同样适用）
+            output_file=(fallback_evaluations_file
+                         if fallback_model and evaluator.model_name == fallback_model
+                         else evaluations_file)
+        )
+        
+        budget.mark_done()
+        print(budget.summary(remaining - 1))
+        
+        if on_question_done is not None and on_question_done() is False:
+            return 'aborted'
+    return 'done'
+
+def run_sharded(df, config, model_api, evaluator, budget, shards):
+    """
+    领取并处理分片，直到没有可领取的分片
+    
+    预算限制按 worker 分别计算：每个 worker 只统计和预测自己处理的问题
+    
+    Args:
+        df (DataFrame): 数据集
+        config (dict): 配置字典
+        model_api (ModelAPI): 模型API
+        evaluator (Evaluator): 评估器
+        budget (BudgetGovernor): 预算控制器
+        shards (ShardManager): 分片管理器
+    """
+    while True:
+        shard = shards.claim()
+        if shard is None:
+            print(f"\nWorker {shards.worker_id}: no shards left to claim")
+            return
+        
+        print(f"\nWorker {shards.worker_id} claimed shard {shard}")
+        status = process_questions(
+            df, shards.question_numbers(shard), config, model_api, evaluator, budget,
+            responses_file=shards.responses_path(shard),
+            evaluations_file=shards.evaluations_path(shard),
+            fallback_evaluations_file=shards.fallback_evaluations_path(shard),
+            on_question_done=lambda: shards.renew(shard),
+            resume_hint="Rerun the worker to continue unfinished shards"
+        )
+        if status == 'budget':
+            shards.release(shard)
+            return
+        if status == 'aborted' or not shards.complete(shard):
+            # 租约已被其他 worker 回收，放弃该分片并领取下一个
+            print(f"\nWorker {shards.worker_id} lost the lease on shard {shard}, skipping it")
+
 def main():
     # 解析命令行参数
     parser = argparse.ArgumentParser(description='LLM Creativity Evaluation System')
@@ -65,6 +183,34 @@ def main():
     parser.add_argument('--start_question', type=int,
                       help='Start Question Number')
     
+    # 预算参数
+    parser.add_argument('--budget_max_cost', type=float,
+                      help='Maximum Spend (USD), 0 for unlimited')
+    parser.add_argument('--budget_max_tokens', type=int,
+                      help='Maximum Total Tokens, 0 for unlimited')
+    parser.add_argument('--budget_max_seconds', type=float,
+                      help='Maximum Run Time (seconds), 0 for unlimited')
+    
+    # 仅评估模式
+    parser.add_argument('--evaluate_only', '--evaluate-only', action='store_true', default=None,
+                      help='Re-evaluate Saved Responses Without Generating New Answers')
+    parser.add_argument('--responses_file', type=str,
+                      help='Saved Responses File (JSON array or JSONL) For Evaluation-Only Mode')
+    parser.add_argument('--eval_model_names', type=str, nargs='+',
+                      help='Evaluator Model Names To Compare In Evaluation-Only Mode')
+    parser.add_argument('--eval_concurrency', type=int,
+                      help='Concurrent Evaluation Requests')
+    
+    # 分片参数
+    parser.add_argument('--shard_size', type=int,
+                      help='Questions Per Shard (enables sharded execution)')
+    parser.add_argument('--shard_lease_seconds', type=float,
+                      help='Shard Lease Duration In Seconds')
+    parser.add_argument('--worker_id', type=str,
+                      help='Worker Identifier')
+    parser.add_argument('--merge', action='store_true', default=None,
+                      help='Merge Finished Shards Into Canonical Output Files')
+    
     # 配置文件
     parser.add_argument('--config', type=str, default='config.yaml',
                       help='Configuration File Path')
@@ -82,13 +228,20 @@ def main():
     # 创建輸出目录
     os.makedirs(config['output_dir'], exist_ok=True)
 
+    # 设置共享连接池
+    http_client.from_config(config)
+
+    # 初始化预算控制器
+    budget = budget_from_config(config)
+
     # 初始化模型API
     model_api = ModelAPI(
         api_key=config['model_api_key'],
         base_url=config['model_base_url'],
         model_name=config['model_name'],
         temperature=config['model_temperature'],
-        max_tokens=config['model_max_tokens']
+        max_tokens=config['model_max_tokens'],
+        budget=budget
     )
     
     # 初始化评估器
@@ -97,48 +250,82 @@ def main():
         base_url=config['eval_base_url'],
         model_name=config['eval_model_name'],
         temperature=config['eval_temperature'],
-        max_tokens=config['eval_max_tokens']
+        max_tokens=config['eval_max_tokens'],
+        budget=budget
     )
 
     # 读取数据集
     df = pd.read_csv(config['dataset_path'])
     
-    # 处理每个问题
-    for index, row in df.iterrows():
-        question_number = index + 1
-        if question_number < config['start_question']:
-            continue
-            
-        print(f"\nProcessing Question {question_number}:")
-        print(f"Field: {row['Field']}")
-        print(f"Question: {row['Question']}")
-        print(f"Principle: {row['Principle']}")
-        
-        # 生成答案并保存到JSON
-        response = model_api.process_question(
-            question=row['Question'],
-            prompt_type=config['prompt_type'],
-            field=row['Field'],
-            principle=row['Principle'],
-            knowledge=row['Knowledge Base'],
-            output_file=os.path.join(
-                config['output_dir'],
-                f"{config['model_name']}_{config['prompt_type']}_responses.json"
+    responses_file = os.path.join(
+        config['output_dir'],
+        f"{config['model_name']}_{config['prompt_type']}_responses.json"
+    )
+    evaluations_file = os.path.join(
+        config['output_dir'],
+        f"{config['eval_model_name']}_{config['prompt_type']}_evaluations.txt"
+    )
+    
+    fallback_evaluations_file = os.path.join(
+        config['output_dir'],
+        f"{config.get('budget_fallback_eval_model')}_{config['prompt_type']}_evaluations.txt"
+    )
+    
+    # 仅评估模式
+    if config.get('evaluate_only'):
+        eval_model_names = config.get('eval_model_names') or [config['eval_model_name']]
+        evaluators = [
+            Evaluator(
+                api_key=config['eval_api_key'],
+                base_url=config['eval_base_url'],
+                model_name=eval_model_name,
+                temperature=config['eval_temperature'],
+                max_tokens=config['eval_max_tokens'],
+                budget=budget
             )
+            for eval_model_name in eval_model_names
+        ]
+        replay_evaluations(
+            responses_file=config.get('responses_file') or responses_file,
+            evaluators=evaluators,
+            output_files=[
+                os.path.join(
+                    config['output_dir'],
+                    f"{config['model_name']}_{eval_model_name}_{config['prompt_type']}_evaluations.txt"
+                )
+                for eval_model_name in eval_model_names
+            ],
+            question_numbers={question: index + 1 for index, question in enumerate(df['Question'])},
+            concurrency=config.get('eval_concurrency', 8),
+            budget=budget
         )
-        
-        print(f"\nModel Response:\n{response}")
-        
-        # 评估答案并保存到TXT
-        evaluator.process_evaluation(
-            question=row['Question'],
-            answer=response,
-            answer_index=question_number,
-            output_file=os.path.join(
-                config['output_dir'],
-                f"{config['eval_model_name']}_{config['prompt_type']}_evaluations.txt"
-            )
+        return
+    
+    # 分片模式
+    if config.get('shard_size'):
+        shards = ShardManager(
+            shard_dir=os.path.join(
+                config['output_dir'], 'shards',
+                f"{config['model_name']}_{config['eval_model_name']}_{config['prompt_type']}"
+            ),
+            num_questions=len(df),
+            shard_size=config['shard_size'],
+            lease_seconds=config.get('shard_lease_seconds', 600),
+            worker_id=config.get('worker_id')
         )
+        if config.get('merge'):
+            shards.merge(responses_file, evaluations_file, fallback_evaluations_file)
+        else:
+            run_sharded(df, config, model_api, evaluator, budget, shards)
+        return
+    
+    # 处理每个问题
+    process_questions(
+        df, range(config['start_question'], len(df) + 1), config, model_api, evaluator, budget,
+        responses_file=responses_file,
+        evaluations_file=evaluations_file,
+        fallback_evaluations_file=fallback_evaluations_file
+    )
 
 if __name__ == '__main__':
     main()
\ No newline at end of file
@@ -5,11 +5,11 @@ Model API module for handling model interactions
 import json
 import os
 from datetime import datetime
-from openai import OpenAI
+from http_client import get_client
 from prompts import SCP_PROMPT, COT_PROMPT, RAG_PROMPT, RCP_PROMPT
 
 class ModelAPI:
-    def __init__(self, api_key, base_url, model_name, temperature=1.0, max_tokens=700):
+    def __init__(self, api_key, base_url, model_name, temperature=1.0, max_tokens=700, budget=None):
         """
         初始化模型API
         
@@ -19,11 +19,13 @@ class ModelAPI:
             model_name (str): 模型名称
             temperature (float): 温度参数
             max_tokens (int): 最大token数
+            budget (BudgetGovernor): 预算控制器（可选）
         """
-        self.client = OpenAI(api_key=api_key, base_url=base_url)
+        self.client = get_client(api_key, base_url)
         self.model_name = model_name
         self.temperature = temperature
         self.max_tokens = max_tokens
+        self.budget = budget
 
     def get_prompt(self, prompt_type, question, field=None, principle=None, knowledge=None):
         """
@@ -67,6 +69,8 @@ class ModelAPI:
             max_tokens=self.max_tokens,
             stream=False
         )
+        if self.budget is not None:
+            self.budget.record('model', response.usage)
         return response.choices[0].message.content
 
     def save_responses(self, question, response, prompt_type, output_file):
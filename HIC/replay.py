@@ -0,0 +1,143 @@
+"""
+评估重放模組
+"""
+
+import json
+import os
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+
+
+def iter_responses(file_path, chunk_size=65536):
+    """
+    流式读取已保存的回应（JSON 数组或 JSONL），不一次性加载整个文件
+
+    Args:
+        file_path (str): 回应文件路径
+        chunk_size (int): 每次读取的字符数
+
+    Yields:
+        dict: 单条回应记录
+    """
+    decoder = json.JSONDecoder()
+    with open(file_path, 'r', encoding='utf-8-sig') as f:
+        # 跳过开头的空白（可能跨越多个块）后再判断格式
+        buffer = ''
+        while not buffer:
+            chunk = f.read(chunk_size)
+            if not chunk:
+                return
+            buffer = chunk.lstrip('\ufeff \t\r\n')
+        if not buffer.startswith('['):
+            # JSONL：逐行解析
+            pending = buffer
+            while True:
+                lines = pending.split('\n')
+                pending = lines.pop()
+                for line in lines:
+                    if line.strip():
+                        yield json.loads(line)
+                chunk = f.read(chunk_size)
+                if not chunk:
+                    break
+                pending += chunk
+            if pending.strip():
+                yield json.loads(pending)
+            return
+
+        # JSON 数组：逐个元素增量解析
+        buffer = buffer[1:]
+        eof = False
+        while True:
+            buffer = buffer.lstrip().lstrip(',').lstrip()
+            if buffer.startswith(']'):
+                return
+            try:
+                item, end = decoder.raw_decode(buffer)
+            except json.JSONDecodeError:
+                if eof:
+                    raise
+                chunk = f.read(chunk_size)
+                eof = not chunk
+                buffer += chunk
+                continue
+            yield item
+            buffer = buffer[end:]
+
+
+def replay_evaluations(responses_file, evaluators, output_files, question_numbers=None, concurrency=8,
+                       budget=None):
+    """
+    使用一个或多个评估器重新评估已保存的回应
+
+    Args:
+        responses_file (str): 回应文件路径
+        evaluators (list): 评估器列表
+        output_files (list): 与评估器一一对应的输出文件路径
+        question_numbers (dict): 问题文本到问题编号的映射，缺失时按顺序编号
+        concurrency (int): 并发评估数
+        budget (BudgetGovernor): 预算控制器（可选），预算将用尽时停止提交新的评估；
+            设置时会先完整扫描一遍回应文件以统计回应总数，用于预测剩余回应的用量
+
+    Returns:
+        int: 重新评估的回应数
+    """
+    question_numbers = question_numbers or {}
+    outputs = []
+    for output_file in output_files:
+        os.makedirs(os.path.dirname(output_file) or '.', exist_ok=True)
+        outputs.append(open(output_file, 'w', encoding='utf-8'))
+
+    failures = [[] for _ in output_files]
+    # 流式统计回应总数，预算摘要按尚未评估的回应数预测
+    total = sum(1 for _ in iter_responses(responses_file)) if budget is not None else 0
+
+    def write_result(answer_index, futures):
+        for output_index, (out, future) in enumerate(zip(outputs, futures)):
+            # 单条评估失败时记录并跳过，不影响其他回应
+            try:
+                evaluation_result = future.result()
+            except Exception as e:
+                print(f"Evaluation of answer {answer_index} failed for {output_files[output_index]}: {e}")
+                failures[output_index].append(answer_index)
+                continue
+            out.write(f"{answer_index}:{evaluation_result}\n")
+            out.flush()
+        if budget is not None:
+            budget.mark_done()
+
+    count = 0
+    try:
+        with ThreadPoolExecutor(max_workers=concurrency) as executor:
+            # 限制在途任务数量，并按原顺序写出结果
+            pending = deque()
+            for position, record in enumerate(iter_responses(responses_file), start=1):
+                if budget is not None:
+                    status = budget.check(in_flight=len(pending))
+                    if status == 'stop':
+                        print(f"\nBudget limit reached after {count} of {total} responses.")
+                        break
+                    if status == 'degrade':
+                        budget.throttle()
+                answer_index = question_numbers.get(record["question"], position)
+                futures = [
+                    executor.submit(evaluator.evaluate_answer, record["question"], record["response"], answer_index)
+                    for evaluator in evaluators
+                ]
+                pending.append((answer_index, futures))
+                count += 1
+                while len(pending) > concurrency:
+                    write_result(*pending.popleft())
+            while pending:
+                write_result(*pending.popleft())
+    finally:
+        for out in outputs:
+            out.close()
+
+    if budget is not None:
+        print(budget.summary(remaining=total - count))
+    for output_file, failed in zip(output_files, failures):
+        print(f"Evaluation results written to {output_file}")
+        if failed:
+            print(f"  Failed answers (not written): {failed}")
+    return count
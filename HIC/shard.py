@@ -0,0 +1,239 @@
+"""
+分片执行模組
+"""
+
+import json
+import os
+import socket
+import time
+
+
+class ShardManager:
+    def __init__(self, shard_dir, num_questions, shard_size, lease_seconds=600, worker_id=None):
+        """
+        初始化分片管理器
+
+        Args:
+            shard_dir (str): 分片目录（多个 worker 共享）
+            num_questions (int): 问题总数
+            shard_size (int): 每个分片的问题数
+            lease_seconds (float): 租约有效期（秒），过期后分片可被其他 worker 领取
+            worker_id (str): worker 标识
+        """
+        self.shard_dir = shard_dir
+        self.num_questions = num_questions
+        self.shard_size = shard_size
+        self.lease_seconds = lease_seconds
+        self.worker_id = worker_id or f"{socket.gethostname()}-{os.getpid()}"
+        self.num_shards = (num_questions + shard_size - 1) // shard_size
+        os.makedirs(shard_dir, exist_ok=True)
+
+    def question_numbers(self, shard):
+        """
+        获取分片包含的问题编号（从1开始）
+
+        Args:
+            shard (int): 分片编号
+
+        Returns:
+            range: 问题编号
+        """
+        start = shard * self.shard_size + 1
+        return range(start, min(start + self.shard_size, self.num_questions + 1))
+
+    def _path(self, shard, suffix):
+        return os.path.join(self.shard_dir, f"shard_{shard:04d}{suffix}")
+
+    def lock_path(self, shard):
+        return self._path(shard, ".lock")
+
+    def done_path(self, shard):
+        return self._path(shard, ".done")
+
+    def _worker_path(self, shard, suffix, worker=None):
+        # 每个 worker 写自己的输出文件，被回收分片的原 worker 不会写入新 worker 的文件
+        return self._path(shard, f".{worker or self.worker_id}{suffix}")
+
+    def responses_path(self, shard, worker=None):
+        return self._worker_path(shard, "_responses.json", worker)
+
+    def evaluations_path(self, shard, worker=None):
+        return self._worker_path(shard, "_evaluations.txt", worker)
+
+    def fallback_evaluations_path(self, shard, worker=None):
+        return self._worker_path(shard, "_fallback_evaluations.txt", worker)
+
+    def _lease(self):
+        return {
+            "worker": self.worker_id,
+            "expires": time.time() + self.lease_seconds
+        }
+
+    def _read_lease(self, path):
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except (FileNotFoundError, json.JSONDecodeError):
+            return None
+
+    def _lease_expires(self, path, lease):
+        """租约过期时间；租约无法读取（例如 worker 在创建锁文件后、写入前崩溃）时按修改时间计算"""
+        if lease is not None:
+            return lease["expires"]
+        try:
+            return os.path.getmtime(path) + self.lease_seconds
+        except FileNotFoundError:
+            return None
+
+    def _create_lock(self, shard):
+        try:
+            fd = os.open(self.lock_path(shard), os.O_CREAT | os.O_EXCL | os.O_WRONLY)
+        except FileExistsError:
+            return False
+        with os.fdopen(fd, 'w', encoding='utf-8') as f:
+            json.dump(self._lease(), f)
+        return True
+
+    def _reclaim_expired(self, shard):
+        """尝试回收已过期的租约，成功时返回 True"""
+        lock_path = self.lock_path(shard)
+        lease = self._read_lease(lock_path)
+        expires = self._lease_expires(lock_path, lease)
+        if expires is None or expires > time.time():
+            return False
+
+        # 通过重命名使只有一个 worker 能回收该租约
+        stale_path = f"{lock_path}.stale-{self.worker_id}"
+        try:
+            os.replace(lock_path, stale_path)
+        except FileNotFoundError:
+            return False
+
+        # 若重命名到的是其他 worker 刚创建的新租约，则将其恢复
+        stale_expires = self._lease_expires(stale_path, self._read_lease(stale_path))
+        if stale_expires is not None and stale_expires > time.time():
+            try:
+                os.link(stale_path, lock_path)
+            except FileExistsError:
+                pass
+            os.remove(stale_path)
+            return False
+
+        os.remove(stale_path)
+        print(f"Reclaiming expired shard {shard} from {lease['worker'] if lease else 'unknown worker'}")
+        return self._create_lock(shard)
+
+    def claim(self):
+        """
+        领取下一个未完成的分片
+
+        Returns:
+            int: 分片编号，没有可领取的分片时返回 None
+        """
+        for shard in range(self.num_shards):
+            if os.path.exists(self.done_path(shard)):
+                continue
+            if self._create_lock(shard) or self._reclaim_expired(shard):
+                # 清除当前 worker 之前留下的部分输出
+                for path in (self.responses_path(shard), self.evaluations_path(shard),
+                             self.fallback_evaluations_path(shard)):
+                    if os.path.exists(path):
+                        os.remove(path)
+                return shard
+        return None
+
+    def renew(self, shard):
+        """
+        续约分片
+
+        Args:
+            shard (int): 分片编号
+
+        Returns:
+            bool: 租约是否仍属于当前 worker
+        """
+        lock_path = self.lock_path(shard)
+        lease = self._read_lease(lock_path)
+        if lease is None or lease["worker"] != self.worker_id:
+            return False
+        tmp_path = f"{lock_path}.{self.worker_id}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(self._lease(), f)
+        os.replace(tmp_path, lock_path)
+        return True
+
+    def complete(self, shard):
+        """
+        标记分片完成并释放租约，.done 文件记录完成该分片的 worker
+
+        Args:
+            shard (int): 分片编号
+
+        Returns:
+            bool: 是否由当前 worker 完成（租约已丢失或分片已被其他 worker 完成时为 False）
+        """
+        if not self.renew(shard):
+            return False
+        try:
+            fd = os.open(self.done_path(shard), os.O_CREAT | os.O_EXCL | os.O_WRONLY)
+        except FileExistsError:
+            self.release(shard)
+            return False
+        with os.fdopen(fd, 'w', encoding='utf-8') as f:
+            f.write(self.worker_id)
+        self.release(shard)
+        return True
+
+    def _done_worker(self, shard):
+        with open(self.done_path(shard), 'r', encoding='utf-8') as f:
+            return f.read().strip()
+
+    def release(self, shard):
+        """
+        释放分片租约（未完成的分片可被重新领取）
+
+        Args:
+            shard (int): 分片编号
+        """
+        lease = self._read_lease(self.lock_path(shard))
+        if lease is not None and lease["worker"] == self.worker_id:
+            os.remove(self.lock_path(shard))
+
+    def merge(self, responses_file, evaluations_file, fallback_evaluations_file=None):
+        """
+        按问题顺序合并所有分片输出
+
+        Args:
+            responses_file (str): 合并后的回应文件路径
+            evaluations_file (str): 合并后的评估文件路径
+            fallback_evaluations_file (str): 合并后的降级评估模型评估文件路径
+        """
+        missing = [shard for shard in range(self.num_shards) if not os.path.exists(self.done_path(shard))]
+        if missing:
+            raise RuntimeError(f"Shards not finished: {missing}")
+
+        # 只读取完成各分片的 worker 的输出
+        workers = [self._done_worker(shard) for shard in range(self.num_shards)]
+
+        responses = []
+        with open(evaluations_file, 'w', encoding='utf-8') as out:
+            for shard, worker in enumerate(workers):
+                if os.path.exists(self.responses_path(shard, worker)):
+                    with open(self.responses_path(shard, worker), 'r', encoding='utf-8') as f:
+                        responses.extend(json.load(f))
+                if os.path.exists(self.evaluations_path(shard, worker)):
+                    with open(self.evaluations_path(shard, worker), 'r', encoding='utf-8') as f:
+                        out.write(f.read())
+
+        fallback_paths = [self.fallback_evaluations_path(shard, worker) for shard, worker in enumerate(workers)
+                          if os.path.exists(self.fallback_evaluations_path(shard, worker))]
+        if fallback_evaluations_file and fallback_paths:
+            with open(fallback_evaluations_file, 'w', encoding='utf-8') as out:
+                for path in fallback_paths:
+                    with open(path, 'r', encoding='utf-8') as f:
+                        out.write(f.read())
+            print(f"Merged fallback evaluator results into {fallback_evaluations_file}")
+
+        with open(responses_file, 'w', encoding='utf-8') as f:
+            json.dump(responses, f, ensure_ascii=False, indent=2)
+        print(f"Merged {self.num_shards} shards into {responses_file} and {evaluations_file}")
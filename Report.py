@@ -0,0 +1,240 @@
+#汇总所有模型和提示词类型的评估结果，按领域生成 IH/DH 表格和图
+import os
+import re
+import glob
+import hashlib
+import argparse
+import numpy as np
+import pandas as pd
+
+EVAL_PATTERN = r"Originality:\s*(\d)\s*Feasibility:\s*(\d)\s*Value:\s*(\d)\s*Hallucination:\s*(Yes|No)"
+SCORES = ["originality", "feasibility", "value"]
+# 聚合结果格式变化时递增，使旧缓存失效
+CACHE_VERSION = 3
+
+
+def file_hash(path):
+    """计算文件内容的 sha256"""
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def question_indices(prefixes, answers_per_question=10, index_mode="auto"):
+    """
+    由每行的 "N:" 前缀（没有时为 NaN）和位置推导问题编号（从0开始，无法确定时为 -1）
+
+    Args:
+        prefixes (Series): 每行的前缀编号
+        answers_per_question (int): 每个问题的回答数
+        index_mode (str): 'answer' 前缀为回答编号（dhp.py 的 问题*10+k），
+            'question' 前缀为问题编号（main.py 和重放评估的输出，无前缀的行属于上一个前缀），
+            'position' 忽略前缀按行位置计算，'auto' 有前缀时按 'answer'，否则按 'position'
+
+    Returns:
+        ndarray: 每行的问题编号
+    """
+    if index_mode == "auto":
+        index_mode = "answer" if prefixes.notna().any() else "position"
+    if index_mode == "position":
+        return np.arange(len(prefixes)) // answers_per_question
+    if index_mode == "question":
+        return prefixes.ffill().fillna(0).to_numpy(dtype=np.int64) - 1
+
+    # 无前缀的行沿用上一行的编号 +1
+    numbers = prefixes.to_numpy(dtype=float)
+    for i in np.flatnonzero(np.isnan(numbers)):
+        numbers[i] = numbers[i - 1] + 1 if i > 0 else 1
+    numbers = numbers.astype(np.int64)
+    questions = (numbers - 1) // answers_per_question
+    # 某个问题的回答数超过 answers_per_question 时，多出的回答编号与下一个问题的编号重叠，
+    # 表现为下一个问题开始时编号回退；将回退之前编号重叠的回答归回上一个问题
+    for i in np.flatnonzero(numbers[1:] <= numbers[:-1]) + 1:
+        j = i - 1
+        while j >= 0 and numbers[i] <= numbers[j] < numbers[i] + answers_per_question:
+            questions[j] = questions[i] - 1
+            j -= 1
+    return questions
+
+
+def parse_evaluations(path, answers_per_question=10, index_mode="auto"):
+    """解析评估文件，每个非空行一个回答；问题编号由行首的 "N:" 前缀推导，无法解析的行被跳过，不影响其他回答的问题编号"""
+    with open(path, "r", encoding="utf-8") as f:
+        lines = pd.Series([line for line in f.read().splitlines() if line.strip()], dtype=object)
+    prefixes = pd.to_numeric(lines.str.extract(r"^\s*(\d+)\s*:", expand=False), errors="coerce")
+    questions = question_indices(prefixes, answers_per_question, index_mode)
+    parsed = lines.str.extract(EVAL_PATTERN, flags=re.IGNORECASE)
+    malformed = parsed[0].isna()
+    if malformed.any():
+        print(f"Warning: {path}: skipped {int(malformed.sum())} unparsable lines at answer positions "
+              f"{malformed[malformed].index.tolist()}")
+    parsed = parsed[~malformed]
+    answers = parsed.iloc[:, :3].astype(np.int8)
+    answers.columns = SCORES
+    answers["hallucination"] = parsed[3].str.lower().eq("yes").to_numpy()
+    answers["position"] = parsed.index.to_numpy()
+    answers["question"] = questions[~malformed.to_numpy()]
+    return answers.reset_index(drop=True)
+
+
+def aggregate(answers, fields, path=""):
+    """
+    计算单个评估文件的中间聚合结果
+
+    Returns:
+        answers: 每个回答的评分（附带问题编号和领域）
+        by_field: 每个领域的计数与总和
+        question_means: 每个问题的 Originality 平均值
+    """
+    answers = answers.copy()
+    overflow = (answers["question"] < 0) | (answers["question"] >= len(fields))
+    if overflow.any():
+        print(f"Warning: {path}: dropped {int(overflow.sum())} answers outside the {len(fields)} dataset questions")
+        answers = answers[~overflow]
+    answers["field"] = np.asarray(fields, dtype=object)[answers["question"].to_numpy()]
+    # 智能性幻觉：Originality >= 4 且 Feasibility >= 3 且 Value >= 4
+    answers["ih"] = (answers["originality"] >= 4) & (answers["feasibility"] >= 3) & (answers["value"] >= 4)
+    answers["dh"] = answers["hallucination"]
+
+    by_field = answers.groupby("field", sort=False).agg(
+        count=("ih", "size"),
+        originality_sum=("originality", "sum"),
+        feasibility_sum=("feasibility", "sum"),
+        value_sum=("value", "sum"),
+        ih=("ih", "sum"),
+        dh=("dh", "sum"),
+    )
+    question_means = answers.groupby(["field", "question"], sort=False)["originality"].mean()
+    return {"answers": answers, "by_field": by_field, "question_means": question_means}
+
+
+def load_aggregate(path, fields, answers_per_question=10, cache_dir=".report_cache", index_mode="auto"):
+    """读取评估文件的聚合结果，内容未变化时直接使用缓存"""
+    key_source = f"{CACHE_VERSION}|{file_hash(path)}|{answers_per_question}|{index_mode}|{'|'.join(fields)}"
+    key = hashlib.sha256(key_source.encode("utf-8")).hexdigest()
+    cache_path = os.path.join(cache_dir, f"{key}.pkl")
+    if os.path.exists(cache_path):
+        return pd.read_pickle(cache_path)
+
+    result = aggregate(parse_evaluations(path, answers_per_question, index_mode), fields, path)
+    os.makedirs(cache_dir, exist_ok=True)
+    pd.to_pickle(result, cache_path)
+    return result
+
+
+def discover(result_dir):
+    """查找 result_dir/{提示词类型}/{模型}_evaluation(s).txt"""
+    cells = []
+    for path in sorted(glob.glob(os.path.join(result_dir, "*", "*_evaluation*.txt"))):
+        prompt_type = os.path.basename(os.path.dirname(path))
+        model = re.sub(r"_evaluations?\.txt$", "", os.path.basename(path))
+        cells.append((prompt_type, model, path))
+    return cells
+
+
+def load_cells(result_dir, dataset_path, answers_per_question=10, cache_dir=".report_cache", index_mode="auto"):
+    """读取所有 (提示词类型, 模型) 单元的聚合结果"""
+    fields = pd.read_csv(dataset_path)["Field"].tolist()
+    return {
+        (prompt_type, model): load_aggregate(path, fields, answers_per_question, cache_dir, index_mode)
+        for prompt_type, model, path in discover(result_dir)
+    }
+
+
+def build_tables(cells):
+    """
+    由各单元的聚合结果生成按领域和总体的表格
+
+    Returns:
+        field_table: 每个 (提示词类型, 模型, 领域) 的 IH/DH 比例与平均分
+        summary: 每个 (提示词类型, 模型) 的 IH/DH 比例、平均分与 Originality 方差
+    """
+    if not cells:
+        raise ValueError("No evaluation files found")
+
+    sums = pd.concat({key: cell["by_field"] for key, cell in cells.items()}, names=["prompt_type", "model"])
+    question_means = pd.concat({key: cell["question_means"] for key, cell in cells.items()},
+                               names=["prompt_type", "model"])
+
+    def to_rates(table):
+        rates = pd.DataFrame(index=table.index)
+        rates["count"] = table["count"]
+        for score in SCORES:
+            rates[f"{score}_mean"] = table[f"{score}_sum"] / table["count"]
+        rates["ih_rate"] = table["ih"] / table["count"]
+        rates["dh_rate"] = table["dh"] / table["count"]
+        return rates
+
+    field_table = to_rates(sums)
+    field_table["originality_variance"] = question_means.groupby(
+        level=["prompt_type", "model", "field"], sort=False).var(ddof=0)
+
+    summary = to_rates(sums.groupby(level=["prompt_type", "model"], sort=False).sum())
+    summary["originality_variance"] = question_means.groupby(
+        level=["prompt_type", "model"], sort=False).var(ddof=0)
+    return field_table, summary
+
+
+def plot_report(field_table, summary, output_dir):
+    """绘制 IH/DH 比例柱状图和按领域的 IH 热力图"""
+    import matplotlib
+    matplotlib.use("Agg")
+    import matplotlib.pyplot as plt
+
+    prompt_types = summary.index.get_level_values("prompt_type").unique()
+    fig, axes = plt.subplots(1, len(prompt_types), figsize=(5 * len(prompt_types), 4), squeeze=False)
+    for ax, prompt_type in zip(axes[0], prompt_types):
+        rates = summary.loc[prompt_type, ["ih_rate", "dh_rate"]]
+        rates.plot.bar(ax=ax, rot=45)
+        ax.set_title(prompt_type)
+        ax.set_ylabel("rate")
+        ax.set_xlabel("")
+    fig.tight_layout()
+    fig.savefig(os.path.join(output_dir, "ih_dh_rates.png"), dpi=200)
+    plt.close(fig)
+
+    for metric in ["ih_rate", "dh_rate"]:
+        heatmap = field_table[metric].unstack("field")
+        fig, ax = plt.subplots(figsize=(1.2 * heatmap.shape[1] + 3, 0.4 * heatmap.shape[0] + 2))
+        image = ax.imshow(heatmap.to_numpy(dtype=float), aspect="auto", cmap="viridis")
+        ax.set_xticks(range(heatmap.shape[1]))
+        ax.set_xticklabels(heatmap.columns, rotation=45, ha="right")
+        ax.set_yticks(range(heatmap.shape[0]))
+        ax.set_yticklabels([f"{prompt_type} / {model}" for prompt_type, model in heatmap.index])
+        fig.colorbar(image, ax=ax, label=metric)
+        fig.tight_layout()
+        fig.savefig(os.path.join(output_dir, f"{metric}_by_field.png"), dpi=200)
+        plt.close(fig)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="IH/DH report over all evaluation files")
+    parser.add_argument("--result_dir", type=str, default="HIC/result", help="Folder with one subfolder per prompt type")
+    parser.add_argument("--dataset_path", type=str, default="HIC/CDID.csv", help="Dataset Path")
+    parser.add_argument("--output_dir", type=str, default="report", help="Output Directory")
+    parser.add_argument("--cache_dir", type=str, default=".report_cache", help="Aggregate Cache Directory")
+    parser.add_argument("--answers_per_question", type=int, default=10, help="Answers Per Question")
+    parser.add_argument("--index_mode", type=str, default="auto", choices=["auto", "answer", "question", "position"],
+                        help="How The N: Line Prefix Maps To Questions")
+    parser.add_argument("--no_plots", action="store_true", help="Skip Figures")
+    args = parser.parse_args()
+
+    cells = load_cells(args.result_dir, args.dataset_path, args.answers_per_question, args.cache_dir,
+                       args.index_mode)
+    field_table, summary = build_tables(cells)
+
+    os.makedirs(args.output_dir, exist_ok=True)
+    field_table.to_csv(os.path.join(args.output_dir, "field_table.csv"))
+    summary.to_csv(os.path.join(args.output_dir, "summary.csv"))
+    if not args.no_plots:
+        plot_report(field_table, summary, args.output_dir)
+
+    with pd.option_context("display.max_rows", None, "display.width", 200):
+        print(summary.round(4))
+    print(f"Report written to {args.output_dir}")
+
+
+if __name__ == "__main__":
+    main()
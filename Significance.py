@@ -0,0 +1,158 @@
+#对模型和提示词类型之间的 IH/DH 比例及平均分差异进行 bootstrap 置信区间和配对置换检验
+import os
+import argparse
+import itertools
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+import pandas as pd
+from Report import load_cells
+
+METRICS = {
+    "ih_rate": "ih",
+    "dh_rate": "dh",
+    "originality_mean": "originality",
+    "feasibility_mean": "feasibility",
+    "value_mean": "value",
+}
+
+
+def question_table(answers):
+    """按问题汇总每个指标的总和与回答数，问题是重采样的单位"""
+    columns = list(METRICS.values())
+    grouped = answers[columns + ["question"]].astype({"ih": float, "dh": float}).groupby("question")
+    return grouped.sum(), grouped.size()
+
+
+def bootstrap_ci(sums, counts, num_resamples=10000, alpha=0.05, seed=0, batch_size=2000):
+    """
+    按问题整体重采样的 bootstrap 置信区间
+
+    Args:
+        sums (ndarray): (问题数, 指标数) 每个问题的指标总和
+        counts (ndarray): (问题数,) 每个问题的回答数
+
+    Returns:
+        lower, upper: 每个指标的置信区间上下界
+    """
+    rng = np.random.default_rng(seed)
+    num_questions = len(counts)
+    stats = []
+    # 分批生成重采样下标，限制内存占用
+    for start in range(0, num_resamples, batch_size):
+        size = min(batch_size, num_resamples - start)
+        idx = rng.integers(0, num_questions, size=(size, num_questions))
+        stats.append(sums[idx].sum(axis=1) / counts[idx].sum(axis=1)[:, None])
+    stats = np.concatenate(stats)
+    return np.quantile(stats, alpha / 2, axis=0), np.quantile(stats, 1 - alpha / 2, axis=0)
+
+
+def paired_permutation_test(diffs, num_resamples=10000, seed=0, batch_size=2000):
+    """
+    配对符号翻转置换检验（双侧）
+
+    Args:
+        diffs (ndarray): (问题数, 指标数) 两个单元在同一问题上的指标差
+
+    Returns:
+        observed, p_values: 平均差与对应的 p 值
+    """
+    rng = np.random.default_rng(seed)
+    observed = diffs.mean(axis=0)
+    extreme = np.zeros(diffs.shape[1])
+    for start in range(0, num_resamples, batch_size):
+        size = min(batch_size, num_resamples - start)
+        signs = rng.choice(np.array([-1.0, 1.0]), size=(size, diffs.shape[0]))
+        permuted = signs @ diffs / diffs.shape[0]
+        extreme += (np.abs(permuted) >= np.abs(observed) - 1e-12).sum(axis=0)
+    return observed, (extreme + 1) / (num_resamples + 1)
+
+
+def _compare(task):
+    """比较两个单元，供进程池调用"""
+    cell_a, cell_b, means_a, means_b, num_resamples, seed = task
+    common = means_a.index.intersection(means_b.index)
+    diffs = (means_a.loc[common] - means_b.loc[common]).to_numpy()
+    observed, p_values = paired_permutation_test(diffs, num_resamples, seed)
+    return [
+        {
+            "prompt_a": cell_a[0], "model_a": cell_a[1],
+            "prompt_b": cell_b[0], "model_b": cell_b[1],
+            "metric": metric, "questions": len(common),
+            "difference": observed[i], "p_value": p_values[i],
+        }
+        for i, metric in enumerate(METRICS)
+    ]
+
+
+def run(cells, num_resamples=10000, alpha=0.05, seed=0, workers=0):
+    """
+    计算所有单元的置信区间，以及同一提示词类型下的模型两两比较、同一模型下的提示词类型两两比较
+
+    Returns:
+        intervals: 每个 (提示词类型, 模型, 指标) 的点估计与置信区间
+        comparisons: 每个比较的平均差与 p 值
+    """
+    seeds = np.random.SeedSequence(seed)
+    tables = {key: question_table(cell["answers"]) for key, cell in cells.items()}
+
+    interval_rows = []
+    for (key, (sums, counts)), child in zip(tables.items(), seeds.spawn(len(tables))):
+        lower, upper = bootstrap_ci(sums.to_numpy(), counts.to_numpy(), num_resamples, alpha,
+                                    child.generate_state(1)[0])
+        estimate = sums.to_numpy().sum(axis=0) / counts.to_numpy().sum()
+        for i, metric in enumerate(METRICS):
+            interval_rows.append({
+                "prompt_type": key[0], "model": key[1], "metric": metric,
+                "estimate": estimate[i], "ci_lower": lower[i], "ci_upper": upper[i],
+            })
+
+    means = {key: sums.div(counts, axis=0) for key, (sums, counts) in tables.items()}
+    pairs = [
+        (cell_a, cell_b) for cell_a, cell_b in itertools.combinations(sorted(means), 2)
+        if cell_a[0] == cell_b[0] or cell_a[1] == cell_b[1]
+    ]
+    tasks = [
+        (cell_a, cell_b, means[cell_a], means[cell_b], num_resamples, child.generate_state(1)[0])
+        for (cell_a, cell_b), child in zip(pairs, seeds.spawn(len(pairs)))
+    ]
+    if workers and workers > 1:
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            results = list(executor.map(_compare, tasks))
+    else:
+        results = [_compare(task) for task in tasks]
+
+    comparisons = pd.DataFrame([row for rows in results for row in rows])
+    return pd.DataFrame(interval_rows), comparisons
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Bootstrap CIs and paired permutation tests for IH/DH and scores")
+    parser.add_argument("--result_dir", type=str, default="HIC/result", help="Folder with one subfolder per prompt type")
+    parser.add_argument("--dataset_path", type=str, default="HIC/CDID.csv", help="Dataset Path")
+    parser.add_argument("--output_dir", type=str, default="report", help="Output Directory")
+    parser.add_argument("--cache_dir", type=str, default=".report_cache", help="Aggregate Cache Directory")
+    parser.add_argument("--answers_per_question", type=int, default=10, help="Answers Per Question")
+    parser.add_argument("--index_mode", type=str, default="auto", choices=["auto", "answer", "question", "position"],
+                        help="How The N: Line Prefix Maps To Questions")
+    parser.add_argument("--num_resamples", type=int, default=10000, help="Bootstrap / Permutation Resamples")
+    parser.add_argument("--alpha", type=float, default=0.05, help="Significance Level")
+    parser.add_argument("--seed", type=int, default=0, help="Random Seed")
+    parser.add_argument("--workers", type=int, default=0, help="Process Pool Size (0 runs in process)")
+    args = parser.parse_args()
+
+    cells = load_cells(args.result_dir, args.dataset_path, args.answers_per_question, args.cache_dir,
+                       args.index_mode)
+    if not cells:
+        print("No evaluation files found")
+        return
+    intervals, comparisons = run(cells, args.num_resamples, args.alpha, args.seed, args.workers)
+
+    os.makedirs(args.output_dir, exist_ok=True)
+    intervals.to_csv(os.path.join(args.output_dir, "confidence_intervals.csv"), index=False)
+    comparisons.to_csv(os.path.join(args.output_dir, "comparisons.csv"), index=False)
+    with pd.option_context("display.max_rows", None, "display.width", 200):
+        print(comparisons[comparisons["p_value"] < args.alpha].round(4))
+
+
+if __name__ == "__main__":
+    main()